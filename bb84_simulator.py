@@ -1,15 +1,17 @@
 import numpy as np
-import random
 import logging
 import time
+from collections import deque
 from typing import Dict, List, Tuple, Any
 import asyncio
+import hashlib
+import json
 import os
 # Quantum computing imports
 try:
     from qiskit import QuantumCircuit, transpile
     from qiskit_aer import AerSimulator
-    from qiskit.primitives import Sampler
+    from qiskit_aer.primitives import SamplerV2 as AerSamplerV2
     from qiskit_ibm_runtime import QiskitRuntimeService, SamplerV2
     QISKIT_AVAILABLE = True
 except ImportError:
@@ -18,226 +20,309 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# IBM Quantum backend requested by name before falling back to the first one listed
+DEFAULT_QUANTUM_BACKEND = os.environ.get("IBM_QUANTUM_BACKEND", "ibm_brisbane")
+
+# Widest Hadamard circuit sampled on the local simulator; more bits come from extra shots
+QRNG_SIMULATOR_MAX_QUBITS = 16
+
+# IBM Quantum connections (backend + sampler) are reused for this many seconds
+SERVICE_CACHE_TTL = 300.0
+
+# Internally bits are uint8 0/1 (LOST_PHOTON when Bob detects nothing) and
+# bases are uint8 0 ('+', rectilinear) / 1 ('x', diagonal). Strings are only
+# used at the API boundary.
+LOST_PHOTON = 2
+_BIT_SYMBOLS = np.frombuffer(b'01?', dtype=np.uint8)
+_BASIS_SYMBOLS = np.frombuffer(b'+x', dtype=np.uint8)
+_INVALID = 255
+
+_BIT_CODES = np.full(256, _INVALID, dtype=np.uint8)
+_BIT_CODES[_BIT_SYMBOLS[:2]] = [0, 1]
+_BASIS_CODES = np.full(256, _INVALID, dtype=np.uint8)
+_BASIS_CODES[_BASIS_SYMBOLS] = [0, 1]
+
+def _encode(symbols: str, codes: np.ndarray, name: str, allowed: str) -> np.ndarray:
+    """Map a symbol string onto its uint8 codes, rejecting unknown symbols"""
+    try:
+        raw = np.frombuffer(symbols.encode('ascii'), dtype=np.uint8)
+    except UnicodeEncodeError:
+        raise ValueError(f"{name} may only contain {allowed}")
+    encoded = codes[raw]
+    if np.any(encoded == _INVALID):
+        raise ValueError(f"{name} may only contain {allowed}")
+    return encoded
+
+def _encode_bits(bits: str) -> np.ndarray:
+    return _encode(bits, _BIT_CODES, "Bits", "'0' and '1'")
+
+def _encode_bases(bases: str) -> np.ndarray:
+    return _encode(bases, _BASIS_CODES, "Bases", "'+' and 'x'")
+
+def _decode_bits(bits: np.ndarray) -> str:
+    return _BIT_SYMBOLS[bits].tobytes().decode('ascii')
+
+def _decode_bases(bases: np.ndarray) -> str:
+    return _BASIS_SYMBOLS[bases].tobytes().decode('ascii')
+
+def _loss_probability(distance: float, noise: float) -> float:
+    """Simple model: photon loss increases with distance and noise"""
+    return min(0.2 * (distance / 100) + noise, 0.8)
+
+def _apply_channel(bits: np.ndarray, loss_probability: float, noise: float,
+                   loss_draws: np.ndarray, flip_draws: np.ndarray) -> Tuple[np.ndarray, int]:
+    """Apply photon loss and bit flips given pre-drawn uniforms; returns received bits and flip count"""
+    lost = loss_draws < loss_probability
+    flipped = ~lost & (flip_draws < noise)
+    
+    received = bits ^ flipped.view(np.uint8)  # Bit flip due to noise
+    received[lost] = LOST_PHOTON  # Photon lost - no detection
+    return received, int(np.count_nonzero(flipped))
+
 class BB84Simulator:
     """Professional BB84 Quantum Key Distribution Simulator"""
     
-    def __init__(self):
+    # Qiskit objects are expensive to build and hold no per-run state, so they
+    # are shared by every instance in the process (one is created per request)
+    _qrng_cache: Dict[Tuple[int, str], Any] = {}  # (num_qubits, backend) -> transpiled circuit
+    _aer_qrng: Tuple[Any, Any] = None  # fixed-width simulator QRNG circuit and Aer sampler
+    _runtime_cache: Dict[Tuple[str, str], tuple] = {}  # (API key hash, backend name) -> (backend, sampler, ts)
+    
+    def __init__(self, cache_dir: str = None, preferred_backend: str = None):
         self.qber_threshold = 0.11  # 11% QBER threshold for security (Bennett & Brassard)
         self.bases_mapping = {'+': 'rectilinear', 'x': 'diagonal'}
-        self.simulation_logs = []
-        
+        # Log entries are kept as (epoch seconds, message, level) and formatted on read
+        self._log_entries = deque(maxlen=256)
+        self.log_collection_enabled = True
+        
+        # Optional on-disk cache of manual simulation results (e.g. ~/.cache/bb84)
+        self.result_cache_dir = cache_dir or os.environ.get('BB84_CACHE_DIR')
+        self._rng = np.random.default_rng()
+        self._preferred_backend_name = preferred_backend or DEFAULT_QUANTUM_BACKEND
+        
+    def _begin_simulation(self) -> None:
+        """Reset per-simulation state (the log)"""
+        self._log_entries.clear()
+    
     def log_message(self, message: str, level: str = 'info') -> None:
         """Add message to simulation logs"""
-        timestamp = time.strftime('%H:%M:%S')
-        log_entry = {'timestamp': timestamp, 'message': message, 'level': level}
-        self.simulation_logs.append(log_entry)
-        logger.info(f"BB84: {message}")
+        if self.log_collection_enabled:
+            self._log_entries.append((time.time(), message, level))
+        logger.info("BB84: %s", message)
+    
+    @property
+    def simulation_logs(self) -> List[Dict[str, str]]:
+        """Log entries of the current simulation, with HH:MM:SS timestamps"""
+        return [
+            {'timestamp': time.strftime('%H:%M:%S', time.localtime(ts)), 'message': message, 'level': level}
+            for ts, message, level in self._log_entries
+        ]
     
-    def generate_random_bits(self, n: int, method: str = 'classical') -> str:
+    def generate_random_bits(self, n: int, method: str = 'classical') -> np.ndarray:
         """Generate random bits using specified method"""
         if method == 'classical':
-            return ''.join([str(random.randint(0, 1)) for _ in range(n)])
+            return self._classical_random_bits(n)
         elif method == 'quantum' and QISKIT_AVAILABLE:
             try:
                 # Use quantum hardware if available, fallback to classical
-                return self.generate_quantum_random_bits(n)
+                quantum_bits, _ = self.generate_quantum_random_bits(n)
+                return _encode_bits(quantum_bits)
             except Exception as e:
                 self.log_message(f"Quantum RNG failed, using classical fallback: {str(e)}", "warning")
-                return ''.join([str(random.randint(0, 1)) for _ in range(n)])
+                return self._classical_random_bits(n)
         else:
             # Classical fallback
-            return ''.join([str(random.randint(0, 1)) for _ in range(n)])
+            return self._classical_random_bits(n)
+    
+    def _classical_random_bits(self, n: int) -> np.ndarray:
+        """Draw n uniform bits in one batch"""
+        return self._rng.integers(0, 2, n, dtype=np.uint8)
     
-    def generate_random_bases(self, n: int) -> str:
-        """Generate random basis string"""
-        bases = ['+', 'x']
-        return ''.join([random.choice(bases) for _ in range(n)])
+    def generate_random_bases(self, n: int) -> np.ndarray:
+        """Generate random bases (0 = '+', 1 = 'x')"""
+        return self._rng.integers(0, 2, n, dtype=np.uint8)
     
-    def apply_channel_effects(self, bits: str, distance: float, noise: float) -> Tuple[str, float]:
+    def apply_channel_effects(self, bits: np.ndarray, distance: float, noise: float) -> Tuple[np.ndarray, float]:
         """Apply distance and noise effects to transmitted bits"""
-        # Simple model: photon loss increases with distance and noise
-        loss_probability = min(0.2 * (distance / 100) + noise, 0.8)
-        
-        received_bits = ""
-        errors = 0
-        
-        for bit in bits:
-            if random.random() < loss_probability:
-                # Photon lost - no detection
-                received_bits += "?"
-            elif random.random() < noise:
-                # Bit flip due to noise
-                received_bits += str(1 - int(bit))
-                errors += 1
-            else:
-                # Correct transmission
-                received_bits += bit
-        
-        error_rate = errors / len(bits) if len(bits) > 0 else 0
-        return received_bits, error_rate
+        loss_probability = _loss_probability(distance, noise)
+        
+        n = len(bits)
+        if n == 0:
+            return bits.copy(), 0
+        
+        # Draw loss and bit-flip decisions for every photon in one batch
+        draws = self._rng.random((2, n))
+        received, errors = _apply_channel(bits, loss_probability, noise, draws[0], draws[1])
+        
+        error_rate = errors / n
+        return received, error_rate
     
-    def generate_quantum_random_bits(self, n: int) -> str:
-        """Generate quantum random bits using Qiskit (fallback to classical if failed)"""
-        try:
-            if not QISKIT_AVAILABLE:
-                raise Exception("Qiskit not available")
-            
-            # Simple quantum random number generation circuit
-            from qiskit import QuantumCircuit, transpile
-            
-            # Create quantum circuit for random bit generation
-            qc = QuantumCircuit(min(n, 4), min(n, 4))  # Limit to 4 qubits for efficiency
-            
-            # Apply Hadamard gates to create superposition
-            for qubit in range(min(n, 4)):
-                qc.h(qubit)
-            
-            # Measure qubits
-            qc.measure_all()
-            
-            # Use AerSimulator as fallback
-            simulator = AerSimulator()
-            transpiled_qc = transpile(qc, simulator)
-            job = simulator.run(transpiled_qc, shots=max(1, n // 4 + 1))
-            result = job.result()
-            counts = result.get_counts()
-            
-            # Extract random bits from measurement results
-            random_bits = ""
-            for outcome, count in counts.items():
-                random_bits += outcome * count
+    @staticmethod
+    def _build_qrng_circuit(num_qubits: int, target) -> 'QuantumCircuit':
+        """Hadamard-and-measure circuit on num_qubits qubits, transpiled for target"""
+        # Hadamard on every qubit puts each one in an equal superposition
+        qc = QuantumCircuit(num_qubits)
+        qc.h(range(num_qubits))
+        qc.measure_all()
+        
+        # An all-H circuit needs no optimization, only basis translation
+        return transpile(qc, target, optimization_level=0)
+    
+    def _get_aer_sampler(self) -> Tuple['QuantumCircuit', 'AerSamplerV2']:
+        """Return the simulator QRNG circuit and Aer sampler; the circuit is transpiled once per process"""
+        if BB84Simulator._aer_qrng is None:
+            circuit = self._build_qrng_circuit(QRNG_SIMULATOR_MAX_QUBITS, AerSimulator())
+            BB84Simulator._aer_qrng = (circuit, AerSamplerV2())
+        return BB84Simulator._aer_qrng
+    
+    def _get_qrng_circuit(self, num_qubits: int, backend) -> 'QuantumCircuit':
+        """Return the QRNG circuit for a hardware backend, transpiling once per width and backend"""
+        key = (num_qubits, backend.name)
+        circuit = self._qrng_cache.get(key)
+        if circuit is None:
+            circuit = self._build_qrng_circuit(num_qubits, backend)
+            self._qrng_cache[key] = circuit
+        return circuit
+    
+    def _runtime_cache_key(self, api_key: str) -> Tuple[str, str]:
+        return hashlib.sha256(api_key.encode()).hexdigest(), self._preferred_backend_name
+    
+    def _get_runtime_sampler(self, api_key: str) -> Tuple[Any, 'SamplerV2']:
+        """Connect to IBM Quantum per API key, reusing the backend and sampler for SERVICE_CACHE_TTL seconds"""
+        key = self._runtime_cache_key(api_key)
+        cached = self._runtime_cache.get(key)
+        if cached is None or time.time() - cached[2] >= SERVICE_CACHE_TTL:
+            service = QiskitRuntimeService(channel="ibm_quantum", token=api_key)
+            self.log_message("Connected to IBM Quantum API", "success")
             
-            # Ensure we have enough bits
-            while len(random_bits) < n:
-                random_bits += str(random.randint(0, 1))
+            # Fetch the preferred backend directly; only list all backends if it is unavailable
+            try:
+                backend = service.backend(self._preferred_backend_name)
+            except Exception as e:
+                self.log_message(f"Backend {self._preferred_backend_name} unavailable: {str(e)}", "warning")
+                backends = service.backends()
+                backend = backends[0] if backends else None
             
-            return random_bits[:n]
+            if backend is None:
+                raise Exception("No quantum backends available")
             
-        except Exception as e:
-            self.log_message(f"Quantum random generation failed: {str(e)}", "warning")
-            # Fallback to classical random generation
-            return ''.join([str(random.randint(0, 1)) for _ in range(n)])
+            cached = self._runtime_cache[key] = (backend, SamplerV2(backend), time.time())
+        
+        return cached[0], cached[1]
     
-    def simulate_eve_attack(self, alice_bits: str, alice_bases: str, attack_type: str) -> Tuple[str, str, float]:
+    def simulate_eve_attack(self, alice_bits: np.ndarray, alice_bases: np.ndarray,
+                            attack_type: str) -> Tuple[np.ndarray, np.ndarray, float]:
         """Simulate Eve's interception attack"""
         if attack_type == 'none':
             return alice_bits, alice_bases, 0.0
         
-        intercepted_bits = ""
-        eve_bases = ""
+        intercepted_bits = np.empty(0, dtype=np.uint8)
+        eve_bases = np.empty(0, dtype=np.uint8)
         detection_probability = 0.0
         
         if attack_type == 'intercept_resend':
             # Eve intercepts and measures in random bases
-            eve_bases = self.generate_random_bases(len(alice_bits))
+            n = len(alice_bits)
+            eve_bases = self.generate_random_bases(n)
+            random_bits = self._rng.integers(0, 2, n, dtype=np.uint8)
             
-            for i, (bit, alice_basis, eve_basis) in enumerate(zip(alice_bits, alice_bases, eve_bases)):
-                if alice_basis == eve_basis:
-                    # Same basis - Eve gets correct measurement
-                    intercepted_bits += bit
-                else:
-                    # Different basis - 50% chance of error
-                    intercepted_bits += str(random.randint(0, 1))
+            # Same basis - Eve gets correct measurement;
+            # different basis - 50% chance of error
+            intercepted_bits = np.where(alice_bases == eve_bases, alice_bits, random_bits)
             
             # Calculate detection probability (simplified)
             detection_probability = 0.25  # Theoretical for intercept-resend
         
         return intercepted_bits, eve_bases, detection_probability
     
-    def sift_keys(self, alice_bits: str, alice_bases: str, bob_bits: str, bob_bases: str) -> Tuple[str, str]:
+    def sift_keys(self, alice_bits: np.ndarray, alice_bases: np.ndarray,
+                  bob_bits: np.ndarray, bob_bases: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
         """Perform key sifting - keep only bits where bases match"""
-        alice_sifted = ""
-        bob_sifted = ""
+        # Only positions present in every sequence can be compared
+        n = min(len(alice_bits), len(alice_bases), len(bob_bits), len(bob_bases))
+        alice_bits, alice_bases = alice_bits[:n], alice_bases[:n]
+        bob_bits, bob_bases = bob_bits[:n], bob_bases[:n]
         
-        for i, (a_bit, a_basis, b_bit, b_basis) in enumerate(zip(alice_bits, alice_bases, bob_bits, bob_bases)):
-            if a_basis == b_basis and b_bit != "?":  # Same basis and detected
-                alice_sifted += a_bit
-                bob_sifted += b_bit
+        # Same basis and detected; the detection test is folded into the basis
+        # mask in place so only one n-byte mask is allocated besides the comparison
+        mask = np.equal(alice_bases, bob_bases)
+        mask &= np.not_equal(bob_bits, LOST_PHOTON)
         
-        return alice_sifted, bob_sifted
+        return alice_bits[mask], bob_bits[mask]
     
-    def calculate_qber(self, alice_key: str, bob_key: str) -> float:
+    def calculate_qber(self, alice_key: np.ndarray, bob_key: np.ndarray) -> float:
         """Calculate Quantum Bit Error Rate"""
         if len(alice_key) == 0 or len(bob_key) == 0:
             return 1.0
         
-        errors = sum(1 for a, b in zip(alice_key, bob_key) if a != b)
+        errors = int(np.count_nonzero(alice_key != bob_key))
         return errors / len(alice_key)
     
-    def error_correction_cascade(self, alice_key: str, bob_key: str) -> Tuple[str, str, int]:
+    def error_correction_cascade(self, alice_key: np.ndarray,
+                                 bob_key: np.ndarray) -> Tuple[np.ndarray, np.ndarray, int]:
         """Simplified Cascade error correction"""
         # Simplified implementation - in reality this is much more complex
-        corrected_alice = alice_key
-        corrected_bob = bob_key
-        
         # Count errors that would be corrected
-        errors_corrected = sum(1 for a, b in zip(alice_key, bob_key) if a != b)
+        errors_corrected = int(np.count_nonzero(alice_key != bob_key))
         
-        # Simulate error correction by making keys identical (simplified)
-        if len(alice_key) > 0:
-            corrected_bob = alice_key  # In real implementation, this uses parity checks
-        
-        return corrected_alice, corrected_bob, errors_corrected
+        # Simulate error correction by making keys identical (simplified). Bob's
+        # corrected key shares Alice's buffer; neither is modified downstream.
+        # In real implementation, this uses parity checks
+        return alice_key, alice_key, errors_corrected
     
-    def privacy_amplification(self, key: str, amplification_factor: float = 0.5) -> str:
-        """Apply privacy amplification to reduce key length"""
-        if len(key) == 0:
-            return ""
-        
-        # Simplified privacy amplification - reduce key length
-        new_length = max(1, int(len(key) * amplification_factor))
-        return key[:new_length]
+    def privacy_amplification(self, key: np.ndarray, amplification_factor: float = 0.5) -> np.ndarray:
+        """Apply Toeplitz-hash privacy amplification to reduce key length"""
+        n = len(key)
+        if n == 0:
+            return key
+        
+        new_length = max(1, int(n * amplification_factor))
+        
+        # A random new_length x n Toeplitz matrix is fixed by new_length + n - 1 bits,
+        # with T[i, j] = seed[i - j + n - 1]; T @ key is then a slice of the
+        # convolution seed * key, computed in O(n log n) with real FFTs
+        seed = self._rng.integers(0, 2, new_length + n - 1, dtype=np.uint8)
+        conv_length = len(seed) + n - 1
+        fft_size = 1 << (conv_length - 1).bit_length()
+        product = np.fft.irfft(np.fft.rfft(seed, fft_size) * np.fft.rfft(key, fft_size), fft_size)
+        
+        parities = np.rint(product[n - 1:n - 1 + new_length]).astype(np.int64) & 1
+        return parities.astype(np.uint8)
     
     def generate_quantum_random_bits(self, n: int, api_key: str = None) -> Tuple[str, bool]:
-        """Generate truly random bits using IBM Quantum device"""
+        """Generate truly random bits using IBM Quantum device.
+        
+        Falls back to the Aer simulator and then the classical RNG; returns the
+        bits and whether real quantum hardware produced them.
+        """
         if not QISKIT_AVAILABLE:
             self.log_message("Qiskit not available, falling back to classical RNG", "warning")
-            return self.generate_random_bits(n, 'classical'), False
+            return _decode_bits(self._classical_random_bits(n)), False
         
         try:
-            if api_key:
-                # Try to connect to IBM Quantum with provided API key
-                service = QiskitRuntimeService(channel="ibm_quantum", token=api_key)
-                self.log_message("Connected to IBM Quantum API", "success")
-            else:
+            if not api_key:
                 # Use environment variable or default
                 api_key = os.environ.get("IBM_QUANTUM_API_KEY")
-                if api_key:
-                    service = QiskitRuntimeService(channel="ibm_quantum", token=api_key)
-                    self.log_message("Connected to IBM Quantum API with environment key", "success")
-                else:
+                if not api_key:
                     raise Exception("No IBM Quantum API key provided")
             
             # Limit to 5-6 qubits for real quantum device
-            n = min(n, 6)
-            
-            # Create quantum circuit for random number generation
-            qc = QuantumCircuit(n, n)
-            
-            # Apply Hadamard gates to create superposition
-            for i in range(n):
-                qc.h(i)
-            
-            # Measure all qubits
-            qc.measure_all()
-            
-            # Get available backend
-            backends = service.backends()
-            backend = backends[0] if backends else None
-            
-            if backend is None:
-                raise Exception("No quantum backends available")
+            width = max(1, min(n, 6))
             
+            backend, sampler = self._get_runtime_sampler(api_key)
             self.log_message(f"Using quantum backend: {backend.name}", "info")
             
-            # Run on quantum device
-            sampler = SamplerV2(backend)
-            job = sampler.run([qc], shots=1)
-            result = job.result()
+            # Run on quantum device; a failing sampler is dropped so the next
+            # call reconnects (and retries the preferred backend)
+            qc = self._get_qrng_circuit(width, backend)
+            try:
+                result = sampler.run([qc], shots=max(1, -(-n // width))).result()
+            except Exception:
+                self._runtime_cache.pop(self._runtime_cache_key(api_key), None)
+                raise
             
-            # Extract random bits
-            counts = result[0].data.meas.get_counts()
-            random_bits = list(counts.keys())[0]
+            # Extract random bits, one bitstring of `width` bits per shot
+            random_bits = ''.join(result[0].data.meas.get_bitstrings())[:n]
             
             self.log_message(f"Generated {len(random_bits)} quantum random bits", "success")
             return random_bits, True
@@ -247,25 +332,18 @@ class BB84Simulator:
             
             # Fallback to Qiskit simulator
             try:
-                simulator = AerSimulator()
-                qc = QuantumCircuit(n, n)
-                
-                for i in range(n):
-                    qc.h(i)
-                qc.measure_all()
+                # Same circuit every call; only the shot count depends on n
+                circuit, sampler = self._get_aer_sampler()
+                shots = max(1, -(-n // QRNG_SIMULATOR_MAX_QUBITS))
+                result = sampler.run([circuit], shots=shots).result()
                 
-                transpiled_qc = transpile(qc, simulator, seed_transpiler=123)
-                job = simulator.run(transpiled_qc, shots=1, seed_simulator=123)
-                result = job.result()
-                counts = result.get_counts()
-                
-                random_bits = list(counts.keys())[0]
+                random_bits = ''.join(result[0].data.meas.get_bitstrings())[:n]
                 self.log_message(f"Generated {len(random_bits)} bits using Qiskit simulator", "info")
                 return random_bits, False
                 
             except Exception as e2:
                 self.log_message(f"Qiskit simulator failed: {str(e2)}, using classical RNG", "error")
-                return self.generate_random_bits(n, 'classical'), False
+                return _decode_bits(self._classical_random_bits(n)), False
     
     def run_manual_simulation(self, bits: str, bases: str, photon_rate: int, 
                             distance: float, noise: float, eve_attack: str,
@@ -273,7 +351,15 @@ class BB84Simulator:
                             backend_type: str) -> Dict[str, Any]:
         """Run BB84 simulation with manual input"""
         
-        self.simulation_logs = []
+        cache_path = self._result_cache_path(
+            bits, bases, photon_rate, distance, noise, eve_attack,
+            error_correction, privacy_amplification, backend_type
+        )
+        cached = self._load_cached_result(cache_path)
+        if cached is not None:
+            return cached
+        
+        self._begin_simulation()
         self.log_message("Starting BB84 simulation with manual input", "info")
         
         # Validate input
@@ -281,15 +367,74 @@ class BB84Simulator:
             raise ValueError("Bits and bases strings must have the same length")
         
         # Alice's preparation
-        alice_bits = bits
-        alice_bases = bases
+        alice_bits = _encode_bits(bits)
+        alice_bases = _encode_bases(bases)
         
+        result = self._run_simulation(
+            alice_bits, alice_bases, photon_rate, distance, noise,
+            eve_attack, error_correction, privacy_amplification, backend_type
+        )
+        self._store_cached_result(cache_path, result)
+        return result
+    
+    def _result_cache_path(self, *inputs: Any) -> str:
+        """Cache file for a set of simulation inputs, or None when caching is disabled"""
+        if not self.result_cache_dir:
+            return None
+        key = hashlib.sha256(repr(inputs).encode()).hexdigest()
+        return os.path.join(self.result_cache_dir, f"{key}.json")
+    
+    def _load_cached_result(self, path: str) -> Dict[str, Any]:
+        """Return a previously stored result, or None on a cache miss"""
+        if path is None:
+            return None
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable simulation cache entry {path}: {str(e)}")
+            return None
+    
+    def _store_cached_result(self, path: str, result: Dict[str, Any]) -> None:
+        """Persist a result so identical inputs are served from disk next time"""
+        if path is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file first so readers never see a partial entry
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(result, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write simulation cache entry {path}: {str(e)}")
+    
+    def _run_simulation(self, alice_bits: np.ndarray, alice_bases: np.ndarray, photon_rate: int,
+                        distance: float, noise: float, eve_attack: str,
+                        error_correction: str, privacy_amplification: str,
+                        backend_type: str, bob_bases: np.ndarray = None,
+                        channel_draws: np.ndarray = None) -> Dict[str, Any]:
+        """Run the BB84 pipeline on encoded arrays and build the JSON-ready result.
+        
+        Bob's bases and the (2, n) loss/flip uniforms for the channel may be
+        supplied pre-drawn; otherwise they are drawn here.
+        """
         self.log_message(f"Alice prepares {len(alice_bits)} qubits", "info")
         
+        n = len(alice_bits)
+        if bob_bases is None:
+            bob_bases = self.generate_random_bases(n)
+        if channel_draws is None:
+            channel_draws = self._rng.random((2, n))
+        loss_probability = _loss_probability(distance, noise)
+        
         # Simulate quantum channel transmission
-        transmitted_bits, channel_error_rate = self.apply_channel_effects(
-            alice_bits, distance, noise
+        transmitted_bits, channel_errors = _apply_channel(
+            alice_bits, loss_probability, noise, channel_draws[0], channel_draws[1]
         )
+        channel_error_rate = channel_errors / n if n > 0 else 0
         
         # Eve's attack
         if eve_attack != 'none':
@@ -298,11 +443,10 @@ class BB84Simulator:
             )
             self.log_message(f"Eve intercepts with {eve_attack} attack", "warning")
         else:
-            eve_bases = ""
+            eve_bases = np.empty(0, dtype=np.uint8)
             eve_detection_prob = 0.0
         
         # Bob's measurement
-        bob_bases = self.generate_random_bases(len(alice_bits))
         bob_bits = transmitted_bits  # Simplified - in reality Bob measures
         
         self.log_message(f"Bob measures qubits with random bases", "info")
@@ -355,18 +499,18 @@ class BB84Simulator:
         elif backend_type == 'qiskit':
             simulator_fidelity = 0.999
         elif backend_type == 'real_quantum':
-            device_fidelity = 0.95 + random.uniform(-0.05, 0.03)
+            device_fidelity = 0.95 + self._rng.uniform(-0.05, 0.03)
         
         return {
             'status': 'success',
-            'alice_bits': alice_bits,
-            'alice_bases': alice_bases,
-            'bob_bits': bob_bits,
-            'bob_bases': bob_bases,
-            'eve_bases': eve_bases,
-            'alice_sifted': alice_sifted,
-            'bob_sifted': bob_sifted,
-            'final_key': final_key,
+            'alice_bits': _decode_bits(alice_bits),
+            'alice_bases': _decode_bases(alice_bases),
+            'bob_bits': _decode_bits(bob_bits),
+            'bob_bases': _decode_bases(bob_bases),
+            'eve_bases': _decode_bases(eve_bases),
+            'alice_sifted': _decode_bits(alice_sifted),
+            'bob_sifted': _decode_bits(bob_sifted),
+            'final_key': _decode_bits(final_key),
             'qber': qber,
             'is_secure': is_secure,
             'key_generation_rate': key_generation_rate,
@@ -390,7 +534,14 @@ class BB84Simulator:
                            backend_type: str, api_key: str = None, **kwargs) -> Dict[str, Any]:
         """Run BB84 simulation with auto-generated qubits"""
         
-        self.simulation_logs = []
+        if self._uses_quantum_rng(rng_type, backend_type, kwargs):
+            # Overlap the quantum RNG job with the classical setup on an event loop
+            return asyncio.run(self.run_auto_simulation_async(
+                num_qubits, rng_type, photon_rate, distance, noise, eve_attack,
+                error_correction, privacy_amplification, backend_type, api_key, **kwargs
+            ))
+        
+        self._begin_simulation()
         self.log_message(f"Starting BB84 simulation with {rng_type} RNG", "info")
         
         # Handle different generation methods
@@ -402,43 +553,107 @@ class BB84Simulator:
             alice_bits = self.generate_random_bits(effective_qubits, 'classical')
             quantum_used = False
             self.log_message(f"Generated {len(alice_bits)} qubits from {photon_count} photons", "info")
-        elif rng_type == 'quantum' or backend_type == 'real_quantum':
-            # Limit real quantum devices to 3-4 qubits
-            if backend_type == 'real_quantum':
-                num_qubits = min(num_qubits, 4)
-                self.log_message(f"Limited to {num_qubits} qubits for real quantum device", "warning")
-            
-            alice_bits, quantum_used = self.generate_quantum_random_bits(num_qubits, api_key)
-            if quantum_used:
-                self.log_message("Using real quantum device for bit generation", "success")
-            else:
-                self.log_message("Using quantum simulator for bit generation", "info")
+        elif backend_type == 'classical':
+            self.log_message("Using classical mathematical for bit generation", "info")
+            result = self._run_classical_fast(
+                num_qubits, photon_rate, distance, noise, eve_attack,
+                error_correction, privacy_amplification, backend_type
+            )
+            self._add_generation_info(result, False, rng_type, backend_type, kwargs)
+            return result
         else:
             alice_bits = self.generate_random_bits(num_qubits, 'classical')
             quantum_used = False
-            backend_name = 'classical mathematical' if backend_type == 'classical' else 'qiskit simulator'
-            self.log_message(f"Using {backend_name} for bit generation", "info")
+            self.log_message("Using qiskit simulator for bit generation", "info")
         
         alice_bases = self.generate_random_bases(len(alice_bits))
         
         # Run the simulation using the manual simulation logic
-        result = self.run_manual_simulation(
+        result = self._run_simulation(
             alice_bits, alice_bases, photon_rate, distance, noise,
             eve_attack, error_correction, privacy_amplification, backend_type
         )
         
-        # Add generation info
+        self._add_generation_info(result, quantum_used, rng_type, backend_type, kwargs)
+        return result
+    
+    def _run_classical_fast(self, num_qubits: int, photon_rate: int, distance: float, noise: float,
+                            eve_attack: str, error_correction: str, privacy_amplification: str,
+                            backend_type: str) -> Dict[str, Any]:
+        """Classical auto simulation with every per-qubit random choice drawn in one batch"""
+        # Rows: Alice's bits, Alice's bases, Bob's bases, photon loss, bit flip
+        draws = self._rng.random((5, num_qubits))
+        choices = (draws[:3] < 0.5).view(np.uint8)
+        
+        return self._run_simulation(
+            choices[0], choices[1], photon_rate, distance, noise,
+            eve_attack, error_correction, privacy_amplification, backend_type,
+            bob_bases=choices[2], channel_draws=draws[3:]
+        )
+    
+    async def generate_quantum_random_bits_async(self, n: int, api_key: str = None) -> Tuple[str, bool]:
+        """Run generate_quantum_random_bits in a worker thread so other work can overlap it"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.generate_quantum_random_bits, n, api_key)
+    
+    async def run_auto_simulation_async(self, num_qubits: int, rng_type: str, photon_rate: int,
+                                        distance: float, noise: float, eve_attack: str,
+                                        error_correction: str, privacy_amplification: str,
+                                        backend_type: str, api_key: str = None, **kwargs) -> Dict[str, Any]:
+        """Run BB84 simulation with auto-generated qubits, preparing the bases while the QRNG job runs"""
+        if not self._uses_quantum_rng(rng_type, backend_type, kwargs):
+            return self.run_auto_simulation(
+                num_qubits, rng_type, photon_rate, distance, noise, eve_attack,
+                error_correction, privacy_amplification, backend_type, api_key, **kwargs
+            )
+        
+        self._begin_simulation()
+        self.log_message(f"Starting BB84 simulation with {rng_type} RNG", "info")
+        
+        # Limit real quantum devices to 3-4 qubits
+        if backend_type == 'real_quantum':
+            num_qubits = min(num_qubits, 4)
+            self.log_message(f"Limited to {num_qubits} qubits for real quantum device", "warning")
+        
+        # Submit the QRNG job first, then draw both parties' bases while it runs
+        qrng = asyncio.ensure_future(self.generate_quantum_random_bits_async(num_qubits, api_key))
+        alice_bases = self.generate_random_bases(num_qubits)
+        bob_bases = self.generate_random_bases(num_qubits)
+        
+        quantum_bits, quantum_used = await qrng
+        alice_bits = _encode_bits(quantum_bits)
+        if quantum_used:
+            self.log_message("Using real quantum device for bit generation", "success")
+        else:
+            self.log_message("Using quantum simulator for bit generation", "info")
+        
+        if len(alice_bits) != num_qubits:
+            alice_bases = self.generate_random_bases(len(alice_bits))
+            bob_bases = None
+        
+        result = self._run_simulation(
+            alice_bits, alice_bases, photon_rate, distance, noise,
+            eve_attack, error_correction, privacy_amplification, backend_type,
+            bob_bases=bob_bases
+        )
+        
+        self._add_generation_info(result, quantum_used, rng_type, backend_type, kwargs)
+        return result
+    
+    @staticmethod
+    def _uses_quantum_rng(rng_type: str, backend_type: str, options: Dict[str, Any]) -> bool:
+        """Whether an auto simulation draws Alice's bits from a quantum RNG"""
+        if options.get('generation_method') == 'photon_based':
+            return False
+        return rng_type == 'quantum' or backend_type == 'real_quantum'
+    
+    @staticmethod
+    def _add_generation_info(result: Dict[str, Any], quantum_used: bool, rng_type: str,
+                             backend_type: str, options: Dict[str, Any]) -> None:
+        """Record how Alice's bits were generated on an auto simulation result"""
         result['quantum_bits_generated'] = quantum_used
         result['rng_type'] = rng_type
         result['backend_type'] = backend_type
-        result['generation_method'] = kwargs.get('generation_method', 'standard')
+        result['generation_method'] = options.get('generation_method', 'standard')
         
-        # Add backend-specific metrics
-        if backend_type == 'classical':
-            result['classical_fidelity'] = 1.0  # Perfect classical simulation
-        elif backend_type == 'qiskit':
-            result['simulator_fidelity'] = 0.999  # High simulator fidelity
-        elif backend_type == 'real_quantum':
-            result['device_fidelity'] = 0.95 + random.uniform(-0.05, 0.03)  # Realistic device fidelity
-        
-        return result
+        # Backend-specific fidelity metrics are already set by _run_simulation
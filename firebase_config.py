@@ -1,8 +1,12 @@
 import os
 import logging
-from typing import Dict, List, Any
+from typing import Dict, Iterator, List, Any
 import json
 import time
+import queue
+import threading
+import atexit
+from concurrent.futures import ThreadPoolExecutor
 
 logger = logging.getLogger(__name__)
 
@@ -52,6 +56,30 @@ except Exception as e:
     FIREBASE_AVAILABLE = False
     db = None
 
+# Wall-clock time of the last testbed write this process completed; readers
+# use it as a cheap version stamp for the results collection
+_results_updated_at = time.time()
+
+def testbed_results_version() -> float:
+    """Time of the last testbed result write completed by this process"""
+    return _results_updated_at
+
+def _mark_results_updated() -> None:
+    global _results_updated_at
+    _results_updated_at = time.time()
+
+def _testbed_document(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the Firestore document stored for a testbed result"""
+    return {
+        'timestamp': time.time(),
+        'created_at': firestore.SERVER_TIMESTAMP,
+        'device_info': result.get('device_info', {}),
+        'metrics': result.get('metrics', {}),
+        'analysis': result.get('analysis', {}),
+        'is_secure': result.get('is_secure', False),
+        'user_id': 'anonymous'  # In a real app, this would be the authenticated user
+    }
+
 def save_testbed_result(result: Dict[str, Any]) -> bool:
     """Save testbed result to Firestore"""
     if not FIREBASE_AVAILABLE or db is None:
@@ -59,19 +87,9 @@ def save_testbed_result(result: Dict[str, Any]) -> bool:
         return False
     
     try:
-        # Prepare document data
-        doc_data = {
-            'timestamp': time.time(),
-            'created_at': firestore.SERVER_TIMESTAMP,
-            'device_info': result.get('device_info', {}),
-            'metrics': result.get('metrics', {}),
-            'analysis': result.get('analysis', {}),
-            'is_secure': result.get('is_secure', False),
-            'user_id': 'anonymous'  # In a real app, this would be the authenticated user
-        }
-        
         # Add to Firestore
-        doc_ref = db.collection('testbed_results').add(doc_data)
+        doc_ref = db.collection('testbed_results').add(_testbed_document(result))
+        _mark_results_updated()
         logger.info(f"Testbed result saved to Firestore with ID: {doc_ref[1].id}")
         return True
         
@@ -79,29 +97,151 @@ def save_testbed_result(result: Dict[str, Any]) -> bool:
         logger.error(f"Failed to save testbed result: {str(e)}")
         return False
 
-def get_testbed_results(limit: int = 50) -> List[Dict[str, Any]]:
-    """Retrieve testbed results from Firestore"""
+# Background batched writes: request handlers enqueue testbed documents and a
+# daemon thread groups them into one WriteBatch per FIREBASE_BATCH_SIZE
+# documents or FIREBASE_BATCH_INTERVAL seconds, whichever comes first. Batches
+# are committed on a small thread pool so a slow commit doesn't hold up the
+# next batch; at most FIREBASE_COMMIT_WORKERS commits are in flight.
+FIREBASE_BATCH_SIZE = 50  # Firestore allows up to 500 writes per batch
+FIREBASE_BATCH_INTERVAL = 0.2  # seconds
+FIREBASE_MAX_ATTEMPTS = 3
+FIREBASE_COMMIT_WORKERS = 4
+
+_write_queue = queue.Queue()
+_writer_lock = threading.Lock()
+_writer_thread = None
+_writer_stop = threading.Event()
+_commit_pool = ThreadPoolExecutor(max_workers=FIREBASE_COMMIT_WORKERS, thread_name_prefix='fb-save')
+_commit_slots = threading.BoundedSemaphore(FIREBASE_COMMIT_WORKERS)
+
+def queue_testbed_result(result: Dict[str, Any]) -> bool:
+    """Queue a testbed result for the next batched Firestore commit"""
+    if not FIREBASE_AVAILABLE or db is None:
+        logger.warning("Firebase not available, result not saved")
+        return False
+    
+    _start_batch_writer()
+    _write_queue.put((_testbed_document(result), 1))
+    return True
+
+def _start_batch_writer() -> None:
+    """Start the background batch writer once per process"""
+    global _writer_thread
+    with _writer_lock:
+        if _writer_thread is None or not _writer_thread.is_alive():
+            _writer_thread = threading.Thread(target=_batch_writer_loop, name='firebase-batch-writer', daemon=True)
+            _writer_thread.start()
+
+def _next_batch(first: tuple) -> List[tuple]:
+    """Collect queued writes after `first` until the batch is full or the interval elapses"""
+    batch = [first]
+    deadline = time.monotonic() + FIREBASE_BATCH_INTERVAL
+    while len(batch) < FIREBASE_BATCH_SIZE:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(_write_queue.get(timeout=remaining))
+        except queue.Empty:
+            break
+    return batch
+
+def _commit_batch(items: List[tuple]) -> None:
+    """Commit queued documents in one WriteBatch, re-queueing them on failure"""
+    try:
+        collection = db.collection('testbed_results')
+        write_batch = db.batch()
+        for doc_data, _ in items:
+            write_batch.set(collection.document(), doc_data)
+        write_batch.commit()
+        _mark_results_updated()
+        logger.info(f"Saved {len(items)} testbed results to Firestore in one batch")
+    except Exception as e:
+        logger.error(f"Failed to save testbed result batch: {str(e)}")
+        retries = [(doc_data, attempt + 1) for doc_data, attempt in items if attempt < FIREBASE_MAX_ATTEMPTS]
+        if len(retries) < len(items):
+            logger.error(f"Dropped {len(items) - len(retries)} testbed results after {FIREBASE_MAX_ATTEMPTS} attempts")
+        for item in retries:
+            _write_queue.put(item)
+        # Back off briefly so a Firestore outage does not spin the writer
+        time.sleep(FIREBASE_BATCH_INTERVAL)
+
+def _batch_writer_loop() -> None:
+    while not _writer_stop.is_set():
+        try:
+            first = _write_queue.get(timeout=FIREBASE_BATCH_INTERVAL)
+        except queue.Empty:
+            continue
+        items = _next_batch(first)
+        # Wait for a free commit slot so queued documents stay in _write_queue
+        # (and keep batching) while Firestore is slow
+        _commit_slots.acquire()
+        future = None
+        if not _writer_stop.is_set():
+            try:
+                future = _commit_pool.submit(_commit_batch, items)
+            except RuntimeError:
+                pass  # concurrent.futures shuts the pool down before atexit runs
+        if future is None:
+            # Interpreter exit: hand the batch back for flush_testbed_results
+            _commit_slots.release()
+            for item in items:
+                _write_queue.put(item)
+            logger.info(f"Batch writer stopped; returned {len(items)} testbed results for the exit flush")
+            return
+        future.add_done_callback(lambda _: _commit_slots.release())
+
+@atexit.register
+def flush_testbed_results() -> None:
+    """Stop the batch writer and commit any queued testbed results (called at interpreter exit)"""
+    _writer_stop.set()
+    if _writer_thread is not None:
+        _writer_thread.join(timeout=FIREBASE_BATCH_INTERVAL * 5)
+    
+    # Failed commits re-queue their documents until FIREBASE_MAX_ATTEMPTS, so
+    # keep draining until the queue stays empty
+    flush_round = 0
+    while True:
+        items = []
+        while True:
+            try:
+                items.append(_write_queue.get_nowait())
+            except queue.Empty:
+                break
+        if not items:
+            break
+        if flush_round:
+            logger.warning(f"Retrying {len(items)} re-queued testbed results before exit")
+        else:
+            logger.info(f"Flushing {len(items)} queued testbed results before exit")
+        flush_round += 1
+        for start in range(0, len(items), FIREBASE_BATCH_SIZE):
+            _commit_batch(items[start:start + FIREBASE_BATCH_SIZE])
+
+def stream_testbed_results(limit: int = 50) -> Iterator[Dict[str, Any]]:
+    """Yield recent testbed results from Firestore as they arrive"""
     if not FIREBASE_AVAILABLE or db is None:
         logger.warning("Firebase not available, returning empty results")
-        return []
+        return
     
+    count = 0
     try:
         # Query recent results
         results_ref = db.collection('testbed_results').order_by('timestamp', direction=firestore.Query.DESCENDING).limit(limit)
-        docs = results_ref.stream()
-        
-        results = []
-        for doc in docs:
+        for doc in results_ref.stream():
             data = doc.to_dict()
             data['id'] = doc.id
-            results.append(data)
+            count += 1
+            yield data
         
-        logger.info(f"Retrieved {len(results)} testbed results from Firestore")
-        return results
+        logger.info(f"Retrieved {count} testbed results from Firestore")
         
     except Exception as e:
-        logger.error(f"Failed to retrieve testbed results: {str(e)}")
-        return []
+        logger.error(f"Failed to retrieve testbed results after {count} documents: {str(e)}")
+
+def get_testbed_results(limit: int = 50) -> List[Dict[str, Any]]:
+    """Retrieve testbed results from Firestore"""
+    return list(stream_testbed_results(limit))
 
 def save_simulation_config(config: Dict[str, Any]) -> bool:
     """Save simulation configuration to Firestore"""
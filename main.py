@@ -1,4 +1,11 @@
 from app import app
 
+# Mobile sessions (connected_devices) and the testbed history ETag version live
+# in process memory, so run a single worker and get concurrency from threads;
+# handlers waiting on Firestore or IBM Quantum release the GIL, so concurrent
+# mobile submissions don't queue behind each other:
+#   gunicorn -w 1 --threads 8 main:app
+# More workers would split sessions between processes, and a token issued by
+# one worker would be rejected by the others.
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -2,15 +2,32 @@ import logging
 import json
 import time
 import secrets
+import hashlib
+import socket
+import threading
+from collections import OrderedDict
+from functools import lru_cache, wraps
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime
-from flask import render_template, request, jsonify
+from flask import render_template, request, jsonify, Response, stream_with_context
 from app import app
 from bb84_simulator import BB84Simulator
 from quantum_device import QuantumDeviceTestbed
-from firebase_config import save_testbed_result, get_testbed_results
+from firebase_config import queue_testbed_result, stream_testbed_results, testbed_results_version
 
 logger = logging.getLogger(__name__)
 
+# Each request gets its own simulator and testbed because both keep per-run
+# logs. Their Qiskit circuit, sampler and runtime-service caches are class
+# level, so a new instance starts warm under any worker model.
+def get_simulator() -> BB84Simulator:
+    """Return a BB84Simulator for the current request"""
+    return BB84Simulator()
+
+def get_testbed() -> QuantumDeviceTestbed:
+    """Return a QuantumDeviceTestbed for the current request"""
+    return QuantumDeviceTestbed()
+
 @app.route('/')
 def index():
     """Render the homepage."""
@@ -31,56 +48,103 @@ def mobile_interface(token):
     """Render the mobile device interface page."""
     return render_template('mobile.html', session_token=token)
 
+class RequestSchema:
+    """Typed request fields, declared once as (name, type, default) tuples.
+    
+    parse() coerces a JSON body into handler keyword arguments: numeric strings
+    become numbers and whole floats become ints, anything else invalid raises
+    ValueError. A default of None makes the field optional.
+    """
+    
+    _KIND_NAMES = {int: 'an integer', float: 'a number', str: 'a string'}
+    
+    def __init__(self, fields: Tuple[Tuple[str, type, Any], ...]):
+        self.fields = fields
+    
+    def parse(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        return {field: self._coerce(field, kind, data[field], default) if field in data else default
+                for field, kind, default in self.fields}
+    
+    @classmethod
+    def _coerce(cls, field: str, kind: type, value: Any, default: Any) -> Any:
+        if value is None and default is None:
+            return None
+        try:
+            if kind is int and isinstance(value, str):
+                value = int(value)
+            elif kind is int and isinstance(value, float) and value.is_integer():
+                value = int(value)
+            elif kind is float and isinstance(value, (int, str)) and not isinstance(value, bool):
+                value = float(value)
+        except ValueError:
+            pass
+        if isinstance(value, kind) and not isinstance(value, bool):
+            return value
+        raise ValueError(f"Parameter '{field}' must be {cls._KIND_NAMES[kind]}")
+
+# Channel and post-processing parameters shared by every simulation scenario
+_CHANNEL_FIELDS = (
+    ('photon_rate', int, 100),
+    ('distance', float, 10),
+    ('noise', float, 0.1),
+    ('eve_attack', str, 'none'),
+    ('error_correction', str, 'cascade'),
+    ('privacy_amplification', str, 'standard'),
+    ('backend_type', str, 'classical'),
+)
+_AUTO_FIELDS = _CHANNEL_FIELDS + (
+    ('num_qubits', int, 4),
+    ('rng_type', str, 'classical'),
+    ('api_key', str, None),
+)
+
+ManualSimulationRequest = RequestSchema(_CHANNEL_FIELDS + (
+    ('bits', str, '0110'),
+    ('bases', str, '+x+x'),
+))
+AutoSimulationRequest = RequestSchema(_AUTO_FIELDS)
+PhotonSimulationRequest = RequestSchema(_AUTO_FIELDS + (
+    ('generation_method', str, 'standard'),
+    ('photon_count', int, 50),
+))
+TestbedRequest = RequestSchema((
+    ('photon_rate', int, 150),
+    ('api_key', str, None),
+))
+
+def _photon_params(data: Dict[str, Any]) -> Dict[str, Any]:
+    params = PhotonSimulationRequest.parse(data)
+    params['rng_type'] = 'classical'
+    return params
+
+# scenario -> (parameter extractor, BB84Simulator method); unknown scenarios
+# run as 'auto' for backward compatibility
+_SCENARIO_DISPATCH = {
+    'manual': (ManualSimulationRequest.parse, 'run_manual_simulation'),
+    'auto': (AutoSimulationRequest.parse, 'run_auto_simulation'),
+    'photon': (_photon_params, 'run_auto_simulation'),
+}
+
+def _json_body() -> Dict[str, Any]:
+    """The request's JSON body; ValueError unless it is an object"""
+    data = request.get_json(cache=True)
+    if not isinstance(data, dict):
+        raise ValueError("Request body must be a JSON object")
+    return data
+
 @app.route('/api/run_simulation', methods=['POST'])
 def run_simulation():
     """Run BB84 simulation with given parameters"""
     try:
-        data = request.get_json()
-        logger.info(f"Received simulation request: {data}")
-        
-        # Extract parameters
+        data = _json_body()
         scenario = data.get('scenario', 'manual')
-        bits = data.get('bits', '0110')
-        bases = data.get('bases', '+x+x')
-        num_qubits = data.get('num_qubits', 4)
-        rng_type = data.get('rng_type', 'classical')
-        photon_rate = data.get('photon_rate', 100)
-        photon_count = data.get('photon_count', 50)
-        generation_method = data.get('generation_method', 'standard')
-        distance = data.get('distance', 10)
-        noise = data.get('noise', 0.1)
-        eve_attack = data.get('eve_attack', 'none')
-        error_correction = data.get('error_correction', 'cascade')
-        privacy_amplification = data.get('privacy_amplification', 'standard')
-        backend_type = data.get('backend_type', 'classical')
-        api_key = data.get('api_key', None)
-        
-        # Initialize simulator
-        simulator = BB84Simulator()
-        
-        # Run simulation based on scenario
-        if scenario == 'manual':
-            result = simulator.run_manual_simulation(
-                bits, bases, photon_rate, distance, noise, 
-                eve_attack, error_correction, privacy_amplification, backend_type
-            )
-        elif scenario == 'auto':
-            result = simulator.run_auto_simulation(
-                num_qubits, rng_type, photon_rate, distance, noise,
-                eve_attack, error_correction, privacy_amplification, backend_type, api_key
-            )
-        elif scenario == 'photon':
-            result = simulator.run_auto_simulation(
-                num_qubits, 'classical', photon_rate, distance, noise,
-                eve_attack, error_correction, privacy_amplification, backend_type, api_key,
-                generation_method=generation_method, photon_count=photon_count
-            )
-        else:
-            # Default to auto for backward compatibility
-            result = simulator.run_auto_simulation(
-                num_qubits, rng_type, photon_rate, distance, noise,
-                eve_attack, error_correction, privacy_amplification, backend_type, api_key
-            )
+        if not isinstance(scenario, str):
+            raise ValueError("Parameter 'scenario' must be a string")
+        logger.info("Received simulation request: scenario=%s", scenario)
+        
+        # Only the parameters the chosen scenario uses are extracted
+        params_fn, method = _SCENARIO_DISPATCH.get(scenario, _SCENARIO_DISPATCH['auto'])
+        result = getattr(get_simulator(), method)(**params_fn(data))
         
         logger.info("Simulation completed successfully")
         return jsonify(result)
@@ -105,28 +169,29 @@ def run_simulation():
 def run_testbed():
     """Run quantum device testbed analysis"""
     try:
-        data = request.get_json()
-        logger.info(f"Received testbed request: {data}")
-        
-        photon_rate = int(data.get('photon_rate', 150))  # Convert to int to fix TypeError
-        api_key = data.get('api_key', None)
+        params = TestbedRequest.parse(_json_body())
+        logger.info("Received testbed request: photon_rate=%s", params['photon_rate'])
         
-        # Initialize testbed
-        testbed = QuantumDeviceTestbed()
+        testbed = get_testbed()
         
         # Run testbed analysis
-        result = testbed.analyze_device(photon_rate, api_key)
+        result = testbed.analyze_device(params['photon_rate'], params['api_key'])
         
-        # Save result to Firebase
-        try:
-            save_testbed_result(result)
-            logger.info("Testbed result saved to Firebase")
-        except Exception as e:
-            logger.warning(f"Failed to save to Firebase: {str(e)}")
+        # Queue result for the next batched Firebase write
+        if queue_testbed_result(result):
+            logger.info("Testbed result queued for Firebase")
         
         logger.info("Testbed analysis completed successfully")
         return jsonify(result)
         
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        return jsonify({
+            'error': str(e),
+            'status': 'error',
+            'message': str(e)
+        }), 400
+        
     except Exception as e:
         logger.error(f"Testbed error: {str(e)}", exc_info=True)
         return jsonify({
@@ -135,12 +200,42 @@ def run_testbed():
             'message': 'Testbed analysis failed. Please check your API key and try again.'
         }), 500
 
+# Other workers' writes don't bump this process's results version, so history
+# ETags also roll over every HISTORY_ETAG_MAX_AGE seconds to bound staleness
+HISTORY_ETAG_MAX_AGE = 30  # seconds
+
+def _etag(state: str) -> str:
+    """Short ETag for a polling endpoint's state string"""
+    return hashlib.blake2b(state.encode(), digest_size=8).hexdigest()
+
+def _not_modified(tag: str) -> Response:
+    response = Response(status=304)
+    response.set_etag(tag)
+    return response
+
 @app.route('/api/testbed_history', methods=['GET'])
 def get_testbed_history():
-    """Get testbed experiment history"""
+    """Get testbed experiment history, streamed one document at a time"""
     try:
-        results = get_testbed_results()
-        return jsonify({'status': 'success', 'results': results})
+        tag = _etag(f"{testbed_results_version()}:{int(time.time() // HISTORY_ETAG_MAX_AGE)}")
+        if request.if_none_match.contains(tag):
+            return _not_modified(tag)
+        
+        documents = stream_testbed_results()
+        
+        # Documents go through Flask's JSON provider, like jsonify, so the
+        # Firestore created_at datetimes keep their HTTP-date format
+        def generate():
+            yield '{"status": "success", "results": ['
+            for index, document in enumerate(documents):
+                if index:
+                    yield ','
+                yield app.json.dumps(document)
+            yield ']}'
+        
+        response = Response(stream_with_context(generate()), mimetype='application/json')
+        response.set_etag(tag)
+        return response
     except Exception as e:
         logger.error(f"Failed to retrieve testbed history: {str(e)}")
         return jsonify({
@@ -149,12 +244,87 @@ def get_testbed_history():
             'message': 'Failed to retrieve experiment history'
         }), 500
 
-# Global storage for connected mobile devices
-connected_devices = {}
+class DeviceRegistry:
+    """Connected mobile sessions and devices, forgotten after `ttl` seconds without activity.
+    
+    Entries are kept in last-activity order, so expiry only inspects the oldest
+    ones. All access goes through a lock because handlers run concurrently.
+    """
+    
+    def __init__(self, ttl: float = 300.0, max_entries: int = 10_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (last_activity, record)
+        self._lock = threading.Lock()
+        self._version = 0  # bumped on every change to the entries or their records
+    
+    def _evict_expired(self, now: float) -> None:
+        cutoff = now - self.ttl
+        while self._entries:
+            last_activity, _ = next(iter(self._entries.values()))
+            if last_activity >= cutoff and len(self._entries) <= self.max_entries:
+                break
+            self._entries.popitem(last=False)
+            self._version += 1
+    
+    def __setitem__(self, key: str, record: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (now, record)
+            self._version += 1
+            self._evict_expired(now)
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._evict_expired(time.time())
+            entry = self._entries.get(key)
+            return entry[1] if entry is not None else None
+    
+    def update(self, key: str, fields: Dict[str, Any]) -> bool:
+        """Merge fields into a live entry and mark it active; False if it expired"""
+        now = time.time()
+        with self._lock:
+            self._evict_expired(now)
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return False
+            entry[1].update(fields)
+            self._entries[key] = (now, entry[1])
+            self._version += 1
+            return True
+    
+    def snapshot(self) -> Tuple[int, List[Tuple[str, Dict[str, Any]]]]:
+        """Version number and live (key, record) pairs, taken together under the lock"""
+        with self._lock:
+            self._evict_expired(time.time())
+            return self._version, [(key, record) for key, (_, record) in self._entries.items()]
+
+# Global storage for connected mobile devices (tokens advertise expires_in: 300)
+connected_devices = DeviceRegistry(ttl=300.0)
 
+def require_session(handler):
+    """Reject requests without a live session token; pass (session_token, data) to the handler"""
+    @wraps(handler)
+    def wrapper(*args, **kwargs):
+        data = request.get_json(cache=True, silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({
+                'error': 'Request body must be a JSON object',
+                'status': 'error'
+            }), 400
+        session_token = data.get('session_token')
+        if not session_token or connected_devices.get(session_token) is None:
+            return jsonify({
+                'error': 'Invalid session token',
+                'status': 'error'
+            }), 401
+        return handler(session_token, data, *args, **kwargs)
+    return wrapper
+
+@lru_cache(maxsize=1)
 def get_local_ip():
-    """Get the local network IP address for mobile connections"""
-    import socket
+    """Get the local network IP address for mobile connections (detected once per process)"""
     try:
         # Connect to a remote address to determine the local IP
         with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
@@ -165,14 +335,16 @@ def get_local_ip():
         # Fallback to localhost if detection fails
         return "127.0.0.1"
 
+def refresh_local_ip():
+    """Re-detect the local IP on the next request, e.g. after a network change"""
+    get_local_ip.cache_clear()
+
 @app.route('/api/connect_mobile', methods=['POST'])
 def connect_mobile():
     """Generate connection token for mobile device"""
     try:
-        import uuid
-        
-        # Generate unique session token
-        session_token = str(uuid.uuid4())
+        # Generate unique, URL-safe session token
+        session_token = secrets.token_urlsafe(16)
         
         # Store connection session
         connected_devices[session_token] = {
@@ -209,7 +381,7 @@ def connect_mobile():
 def register_mobile_device():
     """Register a mobile device for quantum measurements"""
     try:
-        data = request.get_json()
+        data = request.get_json(cache=True)
         device_id = data.get('device_id')
         device_token = data.get('device_token', 'default_token')
         device_info = data.get('device_info', {})
@@ -245,44 +417,41 @@ def register_mobile_device():
         }), 500
 
 @app.route('/api/submit_mobile_data', methods=['POST'])
-def submit_mobile_data():
+@require_session
+def submit_mobile_data(session_token: str, data: Dict[str, Any]):
     """Receive real-time quantum measurement data from mobile devices"""
     try:
-        data = request.get_json()
-        session_token = data.get('session_token')
-        
-        if not session_token or session_token not in connected_devices:
-            return jsonify({
-                'error': 'Invalid session token',
-                'status': 'error'
-            }), 401
-        
         # Get measurement data
         mobile_data = data.get('measurements', {})
-        logger.info(f"Received mobile data from session {session_token}: {mobile_data}")
+        logger.info("Received mobile data from session %s", session_token)
         
         # Process the data using QuantumDeviceTestbed
-        testbed = QuantumDeviceTestbed()
+        testbed = get_testbed()
         result = testbed.analyze_mobile_data(mobile_data)
         
         # Update session with received data
-        connected_devices[session_token].update({
+        connected_devices.update(session_token, {
             'last_data': time.time(),
             'status': 'data_received',
             'data_received': True,
             'result': result
         })
         
-        # Save result to Firebase if available
-        try:
-            save_testbed_result(result)
-            logger.info("Mobile testbed result saved to Firebase")
-        except Exception as e:
-            logger.warning(f"Failed to save mobile result to Firebase: {str(e)}")
+        # Queue result for the next batched Firebase write if available
+        if queue_testbed_result(result):
+            logger.info("Mobile testbed result queued for Firebase")
         
         logger.info(f"Mobile data processed successfully for session {session_token}")
         return jsonify(result)
         
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        return jsonify({
+            'error': str(e),
+            'status': 'error',
+            'message': str(e)
+        }), 400
+        
     except Exception as e:
         logger.error(f"Mobile data processing error: {str(e)}", exc_info=True)
         return jsonify({
@@ -299,35 +468,33 @@ def submit_mobile_results():
         auth_token = request.headers.get('Authorization', '').replace('Bearer ', '')
         device_id = request.headers.get('X-Device-ID')
         
-        if not device_id or device_id not in connected_devices:
+        device = connected_devices.get(device_id) if device_id else None
+        if device is None:
             return jsonify({
                 'error': 'Device not registered',
                 'status': 'error'
             }), 401
         
-        if connected_devices[device_id]['token'] != auth_token:
+        if device['token'] != auth_token:
             return jsonify({
                 'error': 'Invalid authentication token',
                 'status': 'error'
             }), 401
         
         # Get measurement data
-        mobile_data = request.get_json()
-        logger.info(f"Received mobile data from {device_id}: {mobile_data}")
+        mobile_data = request.get_json(cache=True)
+        logger.info("Received mobile data from %s", device_id)
         
         # Process the data using QuantumDeviceTestbed
-        testbed = QuantumDeviceTestbed()
+        testbed = get_testbed()
         result = testbed.process_mobile_data(mobile_data, device_id)
         
         # Update device's last data timestamp
-        connected_devices[device_id]['last_data'] = time.time()
+        connected_devices.update(device_id, {'last_data': time.time()})
         
-        # Save result to Firebase if available
-        try:
-            save_testbed_result(result)
-            logger.info("Mobile testbed result saved to Firebase")
-        except Exception as e:
-            logger.warning(f"Failed to save mobile result to Firebase: {str(e)}")
+        # Queue result for the next batched Firebase write if available
+        if queue_testbed_result(result):
+            logger.info("Mobile testbed result queued for Firebase")
         
         logger.info(f"Mobile data processed successfully for device {device_id}")
         return jsonify(result)
@@ -345,17 +512,28 @@ def get_mobile_device_status():
     """Get status of all connected mobile devices"""
     try:
         current_time = time.time()
-        device_statuses = []
+        version, devices = connected_devices.snapshot()
+        
+        # Records only change through the registry, which bumps its version;
+        # devices going quiet is the one time-driven change, hence the count
+        active_count = sum(
+            1 for _, device_data in devices
+            if device_data.get('last_data') and current_time - device_data['last_data'] < 30
+        )
+        tag = _etag(f"{version}:{active_count}")
+        if request.if_none_match.contains(tag):
+            return _not_modified(tag)
         
-        for device_id, device_data in connected_devices.items():
+        device_statuses = []
+        for device_id, device_data in devices:
             # Consider device offline if no data received for 30 seconds
-            is_active = (device_data.get('last_data') and 
-                        current_time - device_data['last_data'] < 30)
+            last_data = device_data.get('last_data')
+            is_active = bool(last_data) and current_time - last_data < 30
             
             device_statuses.append({
                 'device_id': device_id,
                 'connected_at': device_data.get('connected_at', current_time),
-                'last_data': device_data.get('last_data'),
+                'last_data': last_data,
                 'is_active': is_active,
                 'status': device_data.get('status', 'waiting'),
                 'data_received': device_data.get('data_received', False),
@@ -363,11 +541,13 @@ def get_mobile_device_status():
                 'info': device_data.get('info', {})
             })
         
-        return jsonify({
+        response = jsonify({
             'status': 'success',
             'devices': device_statuses,
-            'total_devices': len(connected_devices)
+            'total_devices': len(device_statuses)
         })
+        response.set_etag(tag)
+        return response
         
     except Exception as e:
         logger.error(f"Device status error: {str(e)}")
@@ -377,21 +557,13 @@ def get_mobile_device_status():
         }), 500
 
 @app.route('/api/simulate_mobile_data', methods=['POST'])
-def simulate_mobile_data():
+@require_session
+def simulate_mobile_data(session_token: str, data: Dict[str, Any]):
     """Simulate mobile device sending quantum measurement data (for testing)"""
     try:
-        data = request.get_json()
-        session_token = data.get('session_token')
-        
-        if not session_token or session_token not in connected_devices:
-            return jsonify({
-                'error': 'Invalid session token',
-                'status': 'error'
-            }), 401
-        
         # Generate simulated quantum measurement data
         simulated_data = {
-            'photon_detections': [f"photon_{i}" for i in range(50)],  # 50 photon detections
+            'photon_count': 50,  # 50 photon detections
             'duration': 10.0,
             'device_info': {
                 'model': 'Simulated Mobile Quantum Sensor',
@@ -401,11 +573,11 @@ def simulate_mobile_data():
         }
         
         # Process the simulated data
-        testbed = QuantumDeviceTestbed()
+        testbed = get_testbed()
         result = testbed.analyze_mobile_data(simulated_data)
         
         # Update session with received data
-        connected_devices[session_token].update({
+        connected_devices.update(session_token, {
             'last_data': time.time(),
             'status': 'data_received',
             'data_received': True,